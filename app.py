@@ -2,6 +2,12 @@ import streamlit as st
 import json
 from datetime import datetime
 import os
+import re
+import asyncio
+import threading
+import logging
+import aiohttp
+import openai  # Example using OpenAI (replace with your preferred API)
 
 # Page config
 st.set_page_config(
@@ -10,7 +16,7 @@ st.set_page_config(
     layout="centered"
 )
 
-# Custom CSS
+# Custom CSS (header only; chat bubbles use st.chat_message)
 st.markdown("""
 <style>
     .main-header {
@@ -21,19 +27,6 @@ st.markdown("""
         border-radius: 10px;
         margin-bottom: 2rem;
     }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 0.5rem 0;
-    }
-    .user-message {
-        background-color: #e3f2fd;
-        margin-left: 2rem;
-    }
-    .assistant-message {
-        background-color: #f5f5f5;
-        margin-right: 2rem;
-    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -52,9 +45,28 @@ if 'messages' not in st.session_state:
     }
     st.session_state.stage = 'greeting'
     st.session_state.tech_questions_asked = 0
+    st.session_state.filled_count = 0
     st.session_state.conversation_active = True
 
 # LLM Integration
+@st.cache_data(show_spinner=False)
+def load_api_key():
+    """Resolve OPENAI_API_KEY once instead of reading Streamlit secrets on every call.
+
+    Raises KeyError when the key is missing, so st.cache_data never stores an empty key
+    """
+    api_key = os.getenv("OPENAI_API_KEY") or st.secrets.get("OPENAI_API_KEY", "")
+    if not api_key:
+        raise KeyError("OPENAI_API_KEY")
+    return api_key
+
+def get_api_key():
+    """Cached API key, or "" while none is configured (re-checked on the next call)"""
+    try:
+        return load_api_key()
+    except KeyError:
+        return ""
+
 def call_llm(prompt, system_prompt):
     """
     Call LLM API. You can use:
@@ -64,11 +76,8 @@ def call_llm(prompt, system_prompt):
     - Together AI (free tier available)
     """
     try:
-        # Example using OpenAI (replace with your preferred API)
-        import openai
-        
         # Set your API key here or use environment variable
-        openai.api_key = os.getenv("OPENAI_API_KEY", st.secrets.get("OPENAI_API_KEY", ""))
+        openai.api_key = get_api_key()
         
         if not openai.api_key:
             return "⚠️ Please configure your API key in the .streamlit/secrets.toml file or environment variables."
@@ -88,17 +97,59 @@ def call_llm(prompt, system_prompt):
     except Exception as e:
         return f"Error calling LLM: {str(e)}\n\nPlease check your API configuration."
 
+async def call_llm_async(prompt, system_prompt):
+    """Async variant of call_llm so independent calls can run concurrently"""
+    try:
+        openai.api_key = get_api_key()
+
+        if not openai.api_key:
+            return "⚠️ Please configure your API key in the .streamlit/secrets.toml file or environment variables."
+
+        response = await openai.ChatCompletion.acreate(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=500
+        )
+
+        return response.choices[0].message.content
+
+    except Exception as e:
+        return f"Error calling LLM: {str(e)}\n\nPlease check your API configuration."
+
+def run_llm_calls(*calls):
+    """Run (prompt, system_prompt) pairs concurrently over one shared HTTP session"""
+    async def gather_calls():
+        async with aiohttp.ClientSession() as session:
+            openai.aiosession.set(session)
+            return await asyncio.gather(
+                *(call_llm_async(prompt, system_prompt) for prompt, system_prompt in calls)
+            )
+    return asyncio.run(gather_calls())
+
+# Static greeting shown on first render (no LLM call needed)
+STATIC_GREETING = "Hi! I'm TalentScout's AI hiring assistant. I'll collect a few details and then ask some technical questions."
+
+# Fixed question for each candidate field (no LLM call needed)
+FIELD_QUESTIONS = {
+    'name': "To start, what's your full name?",
+    'email': "Great — what's your email address?",
+    'phone': "Thanks! What's the best phone number to reach you?",
+    'experience': "How many years of professional experience do you have?",
+    'position': "Which position are you applying for?",
+    'location': "Where are you currently located?",
+    'tech_stack': "Finally, what's your tech stack? List the programming languages, frameworks and tools you work with."
+}
+
+# Exit phrases; only a message that is entirely one of these ends the chat,
+# so answers like "Back-end developer" or "end-to-end tests" don't
+EXIT_PATTERN = re.compile(r"^(bye|goodbye|exit|quit|end|stop|no thanks|that's all)$", re.IGNORECASE)
+
 # Prompt templates
 SYSTEM_PROMPTS = {
-    'greeting': """You are a friendly AI hiring assistant for TalentScout, a recruitment agency. 
-    Greet the candidate warmly and briefly explain that you'll be collecting their information 
-    and asking some technical questions. Keep it concise and professional.""",
-    
-    'collect_info': """You are collecting candidate information. Based on what's already collected,
-    ask for the next missing piece of information in a natural, conversational way.
-    Missing info will be provided in the prompt. Ask only ONE question at a time.
-    Be professional but friendly.""",
-    
     'generate_questions': """You are a technical interviewer. Generate {num} relevant technical 
     questions based on the candidate's tech stack. Questions should:
     - Be specific to the technologies mentioned
@@ -114,6 +165,10 @@ SYSTEM_PROMPTS = {
     team will review their responses and get back to them within 3-5 business days. Keep it brief."""
 }
 
+def get_farewell_message():
+    """Generate the closing message for the candidate"""
+    return call_llm("Generate farewell message", SYSTEM_PROMPTS['farewell'])
+
 def get_missing_info():
     """Identify what information is still needed"""
     data = st.session_state.candidate_data
@@ -131,7 +186,6 @@ def extract_info_from_response(user_input, field):
     
     if field == 'experience':
         # Look for numbers
-        import re
         numbers = re.findall(r'\d+', user_input)
         if numbers:
             return numbers[0] + ' years'
@@ -152,13 +206,10 @@ Format: Return only numbered questions (1-5), nothing else."""
 
 def process_user_input(user_input):
     """Process user input based on conversation stage"""
-    user_input_lower = user_input.lower().strip()
-    
     # Check for exit keywords
-    exit_keywords = ['bye', 'goodbye', 'exit', 'quit', 'end', 'stop', 'no thanks', 'that\'s all']
-    if any(keyword in user_input_lower for keyword in exit_keywords):
+    if EXIT_PATTERN.fullmatch(user_input.strip(" .!")):
         st.session_state.stage = 'farewell'
-        farewell_msg = call_llm("Generate farewell message", SYSTEM_PROMPTS['farewell'])
+        farewell_msg = get_farewell_message()
         st.session_state.messages.append({"role": "assistant", "content": farewell_msg})
         st.session_state.conversation_active = False
         save_candidate_data()
@@ -169,8 +220,7 @@ def process_user_input(user_input):
         # Move to info collection
         st.session_state.stage = 'collect_info'
         missing = get_missing_info()
-        prompt = f"Ask for candidate's {missing}. Be friendly and professional."
-        response = call_llm(prompt, SYSTEM_PROMPTS['collect_info'])
+        response = FIELD_QUESTIONS[missing]
         st.session_state.messages.append({"role": "assistant", "content": response})
     
     elif st.session_state.stage == 'collect_info':
@@ -178,13 +228,15 @@ def process_user_input(user_input):
         missing = get_missing_info()
         if missing:
             info = extract_info_from_response(user_input, missing)
+            # Keep the sidebar's progress count in step with writes instead of recounting every rerun
+            if st.session_state.candidate_data[missing] is None:
+                st.session_state.filled_count += 1
             st.session_state.candidate_data[missing] = info
             
             # Check if we need more info
             next_missing = get_missing_info()
             if next_missing:
-                prompt = f"The candidate just provided their {missing}: {info}. Now ask for their {next_missing}."
-                response = call_llm(prompt, SYSTEM_PROMPTS['collect_info'])
+                response = FIELD_QUESTIONS[next_missing]
                 st.session_state.messages.append({"role": "assistant", "content": response})
             else:
                 # All info collected, move to technical questions
@@ -210,35 +262,52 @@ def process_user_input(user_input):
         
         st.session_state.tech_questions_asked += 1
         
-        # Provide brief feedback
         feedback_prompt = f"Provide brief encouraging feedback on this answer: {user_input[:200]}"
-        feedback = call_llm(feedback_prompt, SYSTEM_PROMPTS['evaluate_answer'])
-        st.session_state.messages.append({"role": "assistant", "content": feedback})
         
         # Check if more questions needed
         if st.session_state.tech_questions_asked < 5:
+            # Provide brief feedback
+            feedback = call_llm(feedback_prompt, SYSTEM_PROMPTS['evaluate_answer'])
+            st.session_state.messages.append({"role": "assistant", "content": feedback})
             next_q_msg = f"Please answer Question {st.session_state.tech_questions_asked + 1}:"
             st.session_state.messages.append({"role": "assistant", "content": next_q_msg})
         else:
-            # All questions answered
+            # All questions answered: feedback and farewell are independent, so fetch them together
             st.session_state.stage = 'farewell'
-            farewell_msg = call_llm("Generate farewell message", SYSTEM_PROMPTS['farewell'])
+            feedback, farewell_msg = run_llm_calls(
+                (feedback_prompt, SYSTEM_PROMPTS['evaluate_answer']),
+                ("Generate farewell message", SYSTEM_PROMPTS['farewell'])
+            )
+            st.session_state.messages.append({"role": "assistant", "content": feedback})
             st.session_state.messages.append({"role": "assistant", "content": farewell_msg})
             st.session_state.conversation_active = False
             save_candidate_data()
 
-def save_candidate_data():
-    """Save candidate data to JSON file"""
+def write_candidate_file(filename, data, status):
+    """Write candidate data to a JSON file (runs on a background thread) and record the outcome in status"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"candidate_{timestamp}.json"
-        
         with open(filename, 'w') as f:
-            json.dump(st.session_state.candidate_data, f, indent=2)
-        
-        st.success(f"✅ Candidate data saved to {filename}")
+            json.dump(data, f, indent=2)
     except Exception as e:
-        st.error(f"Error saving data: {str(e)}")
+        # No script context on this thread, so the error is recorded for the UI and logged
+        logging.exception("Error saving candidate data to %s", filename)
+        status['error'] = str(e)
+    finally:
+        status['done'] = True
+
+def save_candidate_data():
+    """Save candidate data to JSON file once per conversation, without blocking the UI"""
+    status = st.session_state.get('_save_status')
+    if status and not status['error']:
+        # Already written or still in progress; a failed save is retried
+        return
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"candidate_{timestamp}.json"
+    
+    status = {'filename': filename, 'done': False, 'error': None}
+    st.session_state._save_status = status
+    data = st.session_state.candidate_data.copy()
+    threading.Thread(target=write_candidate_file, args=(filename, data, status), daemon=True).start()
 
 # UI
 st.markdown('<div class="main-header"><h1>🤖 TalentScout AI Hiring Assistant</h1><p>Intelligent Candidate Screening</p></div>', unsafe_allow_html=True)
@@ -248,15 +317,12 @@ chat_container = st.container()
 with chat_container:
     # Initial greeting if no messages
     if len(st.session_state.messages) == 0:
-        greeting = call_llm("Greet the candidate", SYSTEM_PROMPTS['greeting'])
-        st.session_state.messages.append({"role": "assistant", "content": greeting})
+        st.session_state.messages.append({"role": "assistant", "content": STATIC_GREETING})
     
     # Display all messages
     for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(f'<div class="chat-message user-message">👤 <b>You:</b><br>{message["content"]}</div>', unsafe_allow_html=True)
-        else:
-            st.markdown(f'<div class="chat-message assistant-message">🤖 <b>Assistant:</b><br>{message["content"]}</div>', unsafe_allow_html=True)
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
 
 # Chat input
 if st.session_state.conversation_active:
@@ -274,6 +340,18 @@ if st.session_state.conversation_active:
 else:
     st.info("💼 Conversation ended. Thank you for your time!")
     
+    # Report the background save once it has finished
+    save_status = st.session_state.get('_save_status')
+    if save_status and save_status['error']:
+        st.error(f"Error saving data: {save_status['error']}")
+        if st.button("💾 Retry Save"):
+            save_candidate_data()
+            st.rerun()
+    elif save_status and save_status['done']:
+        st.success(f"✅ Candidate data saved to {save_status['filename']}")
+    elif save_status:
+        st.info(f"💾 Saving candidate data to {save_status['filename']}...")
+    
     # Show summary
     with st.expander("📋 View Collected Information"):
         st.json(st.session_state.candidate_data)
@@ -289,7 +367,7 @@ with st.sidebar:
     
     # Progress indicators
     total_fields = 7
-    filled_fields = sum(1 for v in st.session_state.candidate_data.values() if v is not None and v != [])
+    filled_fields = st.session_state.filled_count
     progress = filled_fields / total_fields
     
     st.progress(progress)
@@ -2,7 +2,16 @@ import streamlit as st
 import json
 from datetime import datetime
 import os
+import re
+import asyncio
+import functools
+import hashlib
 import requests
+import aiohttp
+import diskcache
+import orjson
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Page config ---
 st.set_page_config(
@@ -11,7 +20,7 @@ st.set_page_config(
     layout="centered"
 )
 
-# --- Minimal custom CSS ---
+# --- Minimal custom CSS (header only; chat bubbles use st.chat_message) ---
 st.markdown("""
 <style>
     .main-header {
@@ -22,21 +31,6 @@ st.markdown("""
         border-radius: 10px;
         margin-bottom: 2rem;
     }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 0.5rem 0;
-    }
-    .user-message {
-        background-color: #e3f2fd;
-        margin-left: 2rem;
-        word-wrap: break-word;
-    }
-    .assistant-message {
-        background-color: #f5f5f5;
-        margin-right: 2rem;
-        word-wrap: break-word;
-    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -69,58 +63,234 @@ if 'greeted' not in st.session_state:
 if 'last_user_message' not in st.session_state:
     st.session_state.last_user_message = None
 
-# Field order and prompts
+# Field order and the fixed question asked for each (no API round-trip)
 FIELD_ORDER = ['name', 'email', 'phone', 'experience', 'position', 'location', 'tech_stack']
-FIELD_PROMPTS = {
-    'name': 'full name',
-    'email': 'email address',
-    'phone': 'phone number',
-    'experience': 'years of experience',
-    'position': 'desired position',
-    'location': 'current location',
-    'tech_stack': 'tech stack (programming languages, frameworks, tools)'
+FIELD_QUESTIONS = {
+    'name': "To start, what's your full name?",
+    'email': "Great — what's your email address?",
+    'phone': "Thanks! What's the best phone number to reach you?",
+    'experience': "How many years of professional experience do you have?",
+    'position': "Which position are you applying for?",
+    'location': "Where are you currently located?",
+    'tech_stack': "Finally, what's your tech stack? List the programming languages, frameworks and tools you work with."
 }
 
+# Exit phrases; only a message that is entirely one of these ends the interview,
+# so answers like "Back-end developer" or "I'd stop the container" don't
+EXIT_PATTERN = re.compile(r"^(bye|goodbye|exit|quit|end|stop)$", re.IGNORECASE)
+
+# Static greeting shown on first render (no API call needed)
+STATIC_GREETING = "Hi! I'm TalentScout's AI hiring assistant. I'll collect a few details and then ask some technical questions."
+
 # --- Groq API wrapper (keeps your original interface) ---
-def call_groq_api(prompt, system_prompt):
-    """Call Groq API (safe guard: returns message if API key missing)."""
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+MISSING_KEY_MESSAGE = "⚠️ Add GROQ_API_KEY in environment or Streamlit secrets to enable AI responses."
+
+@st.cache_resource
+def get_http_session():
+    """Keep-alive session shared by all Groq calls, so the TCP/TLS connection is reused."""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+@st.cache_data(show_spinner=False)
+def load_api_key():
+    """Resolve GROQ_API_KEY once instead of reading Streamlit secrets on every call.
+
+    Raises KeyError when the key is missing, so st.cache_data never stores an empty key.
+    """
+    api_key = os.getenv("GROQ_API_KEY") or st.secrets.get("GROQ_API_KEY", "")
+    if not api_key:
+        raise KeyError("GROQ_API_KEY")
+    return api_key
+
+def get_api_key():
+    """Cached API key, or "" while none is configured (re-checked on the next call)."""
     try:
-        api_key = os.getenv("GROQ_API_KEY", st.secrets.get("GROQ_API_KEY", ""))
+        return load_api_key()
+    except KeyError:
+        return ""
+
+def build_groq_request(prompt, system_prompt):
+    """Return (headers, payload) for a chat completion, or None if the API key is missing."""
+    api_key = get_api_key()
+    if not api_key:
+        return None
+
+    headers = {"Authorization": f"Bearer {api_key}"}
+    data = {
+        "model": "llama-3.1-8b-instant",
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 500
+    }
+    return headers, data
+
+# --- On-disk response cache: repeated prompts (farewell, common feedback) skip the network ---
+LLM_CACHE_DIR = './.llm_cache'
+LLM_CACHE_TTL = 7 * 24 * 60 * 60  # 7 days
+
+@st.cache_resource
+def get_llm_cache():
+    """Disk cache shared across sessions, reruns and app restarts."""
+    return diskcache.Cache(LLM_CACHE_DIR)
+
+def llm_cache_key(data):
+    """Key a request payload by model, system prompt and full prompt (callers already bound its length)."""
+    system_prompt = data['messages'][0]['content']
+    prompt = data['messages'][-1]['content']
+    raw = data['model'] + "|" + system_prompt + "|" + prompt
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def cache_lookup(data):
+    """Return the cached reply for a request payload, or None on a miss."""
+    return get_llm_cache().get(llm_cache_key(data))
+
+def cache_store(data, reply):
+    """Store a reply for a request payload; empty replies are never cached."""
+    if reply:
+        get_llm_cache().set(llm_cache_key(data), reply, expire=LLM_CACHE_TTL)
+
+def llm_cached(fetch):
+    """Decorate a (..., headers, data) fetcher so replies are served from and stored in the disk cache.
+
+    Only replies that come back without raising are stored, so API errors are never cached.
+    """
+    if asyncio.iscoroutinefunction(fetch):
+        @functools.wraps(fetch)
+        async def async_wrapper(*args):
+            reply = cache_lookup(args[-1])
+            if reply is None:
+                reply = await fetch(*args)
+                cache_store(args[-1], reply)
+            return reply
+        return async_wrapper
+
+    @functools.wraps(fetch)
+    def wrapper(*args):
+        reply = cache_lookup(args[-1])
+        if reply is None:
+            reply = fetch(*args)
+            cache_store(args[-1], reply)
+        return reply
+    return wrapper
+
+def fetch_groq_reply(headers, data):
+    """POST a chat completion and return the reply text (raises on HTTP errors)."""
+    response = get_http_session().post(GROQ_API_URL, headers=headers, json=data, timeout=30)
+    response.raise_for_status()
+    result = response.json()
+    return result['choices'][0]['message']['content']
+
+async def fetch_groq_reply_async(session, headers, data):
+    """Async variant of fetch_groq_reply using the given aiohttp session."""
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with session.post(GROQ_API_URL, headers=headers, json=data, timeout=timeout) as response:
+        response.raise_for_status()
+        result = await response.json()
+    return result['choices'][0]['message']['content']
 
-        if not api_key:
-            return "⚠️ Add GROQ_API_KEY in environment or Streamlit secrets to enable AI responses."
+# Cached variants, opted into per call for prompts whose replies can be shared (farewell, feedback)
+fetch_groq_reply_cached = llm_cached(fetch_groq_reply)
+fetch_groq_reply_async_cached = llm_cached(fetch_groq_reply_async)
 
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        data = {
-            "model": "llama-3.1-8b-instant",
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 500
-        }
-        response = requests.post(url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        return result['choices'][0]['message']['content']
+def call_groq_api(prompt, system_prompt, cache=False):
+    """Call Groq API (safe guard: returns message if API key missing). cache=True uses the disk cache."""
+    try:
+        request = build_groq_request(prompt, system_prompt)
+        if request is None:
+            return MISSING_KEY_MESSAGE
+
+        fetch = fetch_groq_reply_cached if cache else fetch_groq_reply
+        return fetch(*request)
     except requests.exceptions.RequestException as e:
         return f"Error connecting to Groq API: {str(e)}"
     except Exception as e:
         return f"An unexpected error occurred: {str(e)}"
 
-# System prompts
-SYSTEM_PROMPTS = {
-    'greeting': """You are a friendly AI hiring assistant for TalentScout. 
-Greet the candidate warmly and explain you'll collect their information and ask technical questions. Keep it to 2-3 sentences.""",
+async def call_groq_api_async(session, prompt, system_prompt, cache=False):
+    """Async variant of call_groq_api; all calls in a batch share one aiohttp session."""
+    try:
+        request = build_groq_request(prompt, system_prompt)
+        if request is None:
+            return MISSING_KEY_MESSAGE
+
+        fetch = fetch_groq_reply_async_cached if cache else fetch_groq_reply_async
+        return await fetch(session, *request)
+    except aiohttp.ClientError as e:
+        return f"Error connecting to Groq API: {str(e)}"
+    except Exception as e:
+        return f"An unexpected error occurred: {str(e)}"
+
+def run_groq_calls(*calls, cache=False):
+    """Run (prompt, system_prompt) pairs concurrently; replies come back in the same order."""
+    async def gather_calls():
+        async with aiohttp.ClientSession() as session:
+            return await asyncio.gather(
+                *(call_groq_api_async(session, prompt, system_prompt, cache=cache)
+                  for prompt, system_prompt in calls)
+            )
+    return asyncio.run(gather_calls())
+
+def stream_groq_api(prompt, system_prompt, cache=False):
+    """Yield the reply as Groq streams it over SSE; cache hits and errors are yielded in one piece."""
+    chunks = []
+    completed = False
+    try:
+        request = build_groq_request(prompt, system_prompt)
+        if request is None:
+            yield MISSING_KEY_MESSAGE
+            return
+
+        headers, data = request
+        cached = cache_lookup(data) if cache else None
+        if cached is not None:
+            yield cached
+            return
+
+        with get_http_session().post(GROQ_API_URL, headers=headers, json={**data, "stream": True},
+                                     timeout=30, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                line = line.decode('utf-8')
+                if not line.startswith("data: "):
+                    continue
+                payload = line[len("data: "):]
+                if payload == "[DONE]":
+                    completed = True
+                    break
+                delta = json.loads(payload)['choices'][0]['delta'].get('content')
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+    except requests.exceptions.RequestException as e:
+        yield f"Error connecting to Groq API: {str(e)}"
+        return
+    except Exception as e:
+        yield f"An unexpected error occurred: {str(e)}"
+        return
 
-    'collect_info': """You are collecting candidate information. 
-Ask for the specified information naturally and briefly. One short question only. If the prompt contains 'Thank them briefly', include a short thank you before the question.""",
+    # Only a stream that reached [DONE] is a complete reply worth caching
+    if cache and completed:
+        cache_store(data, "".join(chunks))
 
+def stream_reply(prompt, system_prompt, cache=False):
+    """Stream a reply into a live chat bubble and return the full text.
+
+    The bubble is cleared afterwards; the caller renders the stored message with the rest.
+    """
+    placeholder = st.empty()
+    with placeholder.container():
+        with st.chat_message("assistant"):
+            reply = st.write_stream(stream_groq_api(prompt, system_prompt, cache=cache))
+    placeholder.empty()
+    return reply
+
+# System prompts
+SYSTEM_PROMPTS = {
     'generate_questions': """Generate 5 technical interview questions based on the tech stack.
 Be specific to the technologies mentioned. Return ONLY numbered questions 1-5.""",
 
@@ -130,22 +300,30 @@ Be specific to the technologies mentioned. Return ONLY numbered questions 1-5.""
 and contact them in 3-5 business days. Keep brief."""
 }
 
+@st.cache_resource
+def get_executor():
+    """Thread pool shared across sessions and reruns for background work (saving candidate data)."""
+    return ThreadPoolExecutor(max_workers=4)
+
 def generate_technical_questions(tech_stack):
     prompt = f"Tech stack: {tech_stack}\n\nGenerate 5 specific technical questions. Format: numbered 1-5 only."
     return call_groq_api(prompt, SYSTEM_PROMPTS['generate_questions'])
 
-def save_candidate_data():
-    """Save to JSON"""
+def get_farewell_message():
+    """Farewell uses a fixed prompt, so after the first interview it comes from the disk cache."""
+    return call_groq_api("Generate farewell", SYSTEM_PROMPTS['farewell'], cache=True)
+
+def save_candidate_data(candidate_data):
+    """Save to JSON (takes the data explicitly so it can run on a worker thread)"""
     try:
         os.makedirs('candidate_data', exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        name = st.session_state.candidate_data.get('name', 'unknown') or 'unknown'
+        name = candidate_data.get('name', 'unknown') or 'unknown'
         name = str(name).replace(" ", "_")
         filename = f"candidate_data/{name}_{timestamp}.json"
 
-        data_to_save = st.session_state.candidate_data.copy()
-        with open(filename, 'w') as f:
-            json.dump(data_to_save, f, indent=2)
+        data_to_save = candidate_data.copy()
+        Path(filename).write_bytes(orjson.dumps(data_to_save, option=orjson.OPT_INDENT_2))
 
         return f"✅ Data saved: `{filename}`"
     except Exception as e:
@@ -155,23 +333,17 @@ def save_candidate_data():
 def handle_greeting_stage():
     """Perform greeting only once."""
     if not st.session_state.greeted:
-        greeting = call_groq_api("Greet the candidate for a hiring interview", SYSTEM_PROMPTS['greeting'])
-        st.session_state.messages.append({"role": "assistant", "content": greeting})
+        st.session_state.messages.append({"role": "assistant", "content": STATIC_GREETING})
         st.session_state.greeted = True
         st.session_state.stage = 'collect_info'
         # Ask the first info field right away
-        ask_next_info_field(is_first_field=True)
+        ask_next_info_field()
 
-def ask_next_info_field(is_first_field=False):
+def ask_next_info_field():
     """Push an assistant message asking for the next info field."""
     if st.session_state.current_field_index < len(FIELD_ORDER):
         next_field = FIELD_ORDER[st.session_state.current_field_index]
-        if is_first_field:
-            prompt = f"Ask for their {FIELD_PROMPTS[next_field]}. One short question."
-        else:
-            prompt = f"Thank them briefly. Then ask for their {FIELD_PROMPTS[next_field]}. Keep short."
-
-        response = call_groq_api(prompt, SYSTEM_PROMPTS['collect_info'])
+        response = FIELD_QUESTIONS[next_field]
         st.session_state.messages.append({"role": "assistant", "content": response})
     else:
         # All info gathered -> proceed to technical questions
@@ -193,7 +365,7 @@ def process_user_input_info(user_input):
         st.session_state.candidate_data[current_field] = user_input.strip()
         st.session_state.current_field_index += 1
         # Ask next field or move forward
-        ask_next_info_field(is_first_field=False)
+        ask_next_info_field()
     else:
         # Defensive: if somehow called when all fields done, move to technical
         st.session_state.stage = 'technical_questions'
@@ -209,19 +381,25 @@ def process_user_input_technical(user_input):
     st.session_state.candidate_data['technical_answers'].append(qa)
     st.session_state.tech_questions_asked += 1
 
-    # Get feedback and append
     feedback_prompt = f"Brief encouraging feedback on the answer: {user_input[:200]}..."
-    feedback = call_groq_api(feedback_prompt, SYSTEM_PROMPTS['evaluate_answer'])
-    st.session_state.messages.append({"role": "assistant", "content": feedback})
 
     # Ask next or finish
     if st.session_state.tech_questions_asked < 5:
+        feedback = stream_reply(feedback_prompt, SYSTEM_PROMPTS['evaluate_answer'], cache=True)
+        st.session_state.messages.append({"role": "assistant", "content": feedback})
         next_q = f"\n**Please answer Question {st.session_state.tech_questions_asked + 1}:**"
         st.session_state.messages.append({"role": "assistant", "content": next_q})
     else:
-        farewell = call_groq_api("Generate farewell", SYSTEM_PROMPTS['farewell'])
+        # Last answer: saving, feedback and farewell are independent, so they all run concurrently
+        save_future = get_executor().submit(save_candidate_data, st.session_state.candidate_data.copy())
+        feedback, farewell = run_groq_calls(
+            (feedback_prompt, SYSTEM_PROMPTS['evaluate_answer']),
+            ("Generate farewell", SYSTEM_PROMPTS['farewell']),
+            cache=True
+        )
+        st.session_state.messages.append({"role": "assistant", "content": feedback})
         st.session_state.messages.append({"role": "assistant", "content": farewell})
-        save_message = save_candidate_data()
+        save_message = save_future.result()
         st.session_state.messages.append({"role": "assistant", "content": save_message})
         st.session_state.conversation_active = False
 
@@ -237,29 +415,50 @@ st.markdown('''
 if st.session_state.stage == 'greeting':
     handle_greeting_stage()
 
-# Display chat messages
-chat_container = st.container()
-with chat_container:
-    for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(f'''
-                <div class="chat-message user-message">
-                    👤 <b>You:</b><br>{message["content"]}
-                </div>
-                ''', unsafe_allow_html=True)
-        else:
-            st.markdown(f'''
-                <div class="chat-message assistant-message">
-                    🤖 <b>Assistant:</b><br>{message["content"]}
-                </div>
-                ''', unsafe_allow_html=True)
+def render_messages(messages):
+    """Draw chat bubbles for the given messages."""
+    for message in messages:
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+
+def render_progress():
+    """Interview progress and debug info, drawn in the main area so fragment reruns keep it current."""
+    st.subheader("📊 Interview Progress")
+    col1, col2 = st.columns(2)
+    with col1:
+        info_progress = st.session_state.current_field_index / len(FIELD_ORDER)
+        st.progress(info_progress)
+        st.write(f"**Info Collected:** {st.session_state.current_field_index}/{len(FIELD_ORDER)}")
+    with col2:
+        st.progress(st.session_state.tech_questions_asked / 5)
+        st.write(f"**Tech Questions:** {st.session_state.tech_questions_asked}/5")
+
+    with st.expander("🔍 Debug Info"):
+        st.write(f"**Stage:** {st.session_state.stage}")
+        st.write(f"**Field Index:** {st.session_state.current_field_index}")
+        if st.session_state.current_field_index < len(FIELD_ORDER):
+            st.write(f"**Next Field:** {FIELD_ORDER[st.session_state.current_field_index]}")
+        st.write(f"**Messages:** {len(st.session_state.messages)}")
+        st.write("**Stored Data:**")
+        for field in FIELD_ORDER:
+            value = st.session_state.candidate_data.get(field, 'N/A')
+            st.caption(f"{field}: {value if value else 'None'}")
+
+@st.fragment
+def chat_fragment():
+    """Chat history and input form. Submitting reruns only this fragment, not the header, CSS or sidebar."""
+    # Progress sits above the chat but is drawn last, once this submission has been processed
+    progress_container = st.container()
+    # The container sits above the form; new messages are drawn into it as they arrive, so no rerun is needed
+    chat_container = st.container()
 
-# Chat input and processing
-if st.session_state.conversation_active:
     with st.form("chat_form", clear_on_submit=True):
         user_input = st.text_input("Type your response here...", key="user_input_key")
         submit_button = st.form_submit_button("Send")
 
+    with chat_container:
+        render_messages(st.session_state.messages)
+
     if submit_button:
         raw = (user_input or "").strip()
         if not raw:
@@ -272,29 +471,44 @@ if st.session_state.conversation_active:
                 st.session_state.last_user_message = raw
                 st.session_state.messages.append({"role": "user", "content": raw})
 
-                # exit keywords
-                if any(word in raw.lower() for word in ['bye', 'goodbye', 'exit', 'quit', 'end', 'stop']):
-                    farewell = call_groq_api("Generate farewell", SYSTEM_PROMPTS['farewell'])
-                    save_message = save_candidate_data()
-                    st.session_state.messages.append({"role": "assistant", "content": farewell})
-                    st.session_state.messages.append({"role": "assistant", "content": save_message})
-                    st.session_state.conversation_active = False
-                    # rerun to immediately show final messages
-                    st.experimental_rerun()
-                else:
-                    # route by stage
-                    if st.session_state.stage == 'collect_info':
-                        process_user_input_info(raw)
-                    elif st.session_state.stage == 'technical_questions':
-                        process_user_input_technical(raw)
-                    else:
-                        st.session_state.messages.append({"role": "assistant", "content": "I'm not sure what to do next. Restarting interview."})
+                # Process inside the container so streamed replies show up under the history
+                with chat_container:
+                    render_messages(st.session_state.messages[-1:])
+                    posted = len(st.session_state.messages)
+
+                    # exit keywords
+                    if EXIT_PATTERN.fullmatch(raw.strip(" .!")):
+                        # write the JSON on a worker thread while the farewell request is in flight
+                        save_future = get_executor().submit(save_candidate_data, st.session_state.candidate_data.copy())
+                        farewell = get_farewell_message()
+                        save_message = save_future.result()
+                        st.session_state.messages.append({"role": "assistant", "content": farewell})
+                        st.session_state.messages.append({"role": "assistant", "content": save_message})
                         st.session_state.conversation_active = False
+                    else:
+                        # route by stage
+                        if st.session_state.stage == 'collect_info':
+                            process_user_input_info(raw)
+                        elif st.session_state.stage == 'technical_questions':
+                            process_user_input_technical(raw)
+                        else:
+                            st.session_state.messages.append({"role": "assistant", "content": "I'm not sure what to do next. Restarting interview."})
+                            st.session_state.conversation_active = False
+
+                    # Interview over: one full-app rerun swaps the form for the summary
+                    if not st.session_state.conversation_active:
+                        st.rerun()
 
-                    # IMPORTANT: single safe rerun so the assistant's next message shows immediately.
-                    st.experimental_rerun()
+                    render_messages(st.session_state.messages[posted:])
 
+    with progress_container:
+        render_progress()
+
+if st.session_state.conversation_active:
+    chat_fragment()
 else:
+    render_progress()
+    render_messages(st.session_state.messages)
     st.info("💼 Interview completed! Thank you.")
     with st.expander("📋 View Collected Information", expanded=True):
         col1, col2 = st.columns(2)
@@ -337,33 +551,10 @@ else:
         st.session_state.stage = 'greeting'
         st.session_state.greeted = False
         st.session_state.last_user_message = None
-        st.experimental_rerun()  # single, explicit rerun on restart
+        st.rerun()  # single, explicit rerun on restart
 
-# Sidebar / debug info
+# Sidebar (static; live progress is drawn by render_progress)
 with st.sidebar:
-    st.header("📊 Interview Progress")
-    if st.session_state.stage != 'greeting':
-        info_progress = st.session_state.current_field_index / len(FIELD_ORDER)
-        st.progress(info_progress)
-        st.write(f"**Info Collected:** {st.session_state.current_field_index}/{len(FIELD_ORDER)}")
-    else:
-        st.progress(0.0)
-        st.write("**Info Collected:** 0/" + str(len(FIELD_ORDER)))
-
-    st.write(f"**Tech Questions:** {st.session_state.tech_questions_asked}/5")
-
-    with st.expander("🔍 Debug Info"):
-        st.write(f"**Stage:** {st.session_state.stage}")
-        st.write(f"**Field Index:** {st.session_state.current_field_index}")
-        if st.session_state.current_field_index < len(FIELD_ORDER):
-            st.write(f"**Next Field:** {FIELD_ORDER[st.session_state.current_field_index]}")
-        st.write(f"**Messages:** {len(st.session_state.messages)}")
-        st.write("**Stored Data:**")
-        for field in FIELD_ORDER:
-            value = st.session_state.candidate_data.get(field, 'N/A')
-            st.caption(f"{field}: {value if value else 'None'}")
-
-    st.markdown("---")
     st.header("✨ Features")
     st.write("✅ Robust state handling")
     st.write("✅ Context-aware responses")